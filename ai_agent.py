@@ -14,6 +14,8 @@ import base64
 import asyncio
 import subprocess
 import platform
+import threading
+from collections import OrderedDict, deque
 from datetime import datetime, timedelta
 from typing import List, Dict, Any, Tuple
 import pandas as pd
@@ -37,6 +39,8 @@ from config import (
 # LMNT SDK import
 try:
     from lmnt.api import Speech
+    # lmnt 0.1.0 is built on aiohttp; its connection errors tell a broken session apart
+    import aiohttp
     LMNT_AVAILABLE = True
 except ImportError:
     LMNT_AVAILABLE = False
@@ -49,6 +53,26 @@ except ImportError:
     PYGAME_AVAILABLE = False
     print("⚠️ pygame not available - will use system audio commands")
 
+# orjson parses and serializes analysis payloads much faster than the stdlib;
+# fall back to json if it isn't installed. orjson.JSONDecodeError subclasses
+# json.JSONDecodeError, so existing except clauses still apply.
+try:
+    import orjson
+
+    def json_loads(text: str) -> Any:
+        return orjson.loads(text)
+
+    def json_dumps(obj: Any) -> str:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode('utf-8')
+except ImportError:
+    json_loads = json.loads
+    json_dumps = json.dumps
+
+# Emotion-based messages are reused for up to this many seconds, for at most
+# this many distinct (emotion, page) combinations
+EMOTION_MESSAGE_TTL = 300
+EMOTION_MESSAGE_CACHE_SIZE = 128
+
 
 class SmartStudentAIAgent:
     def __init__(self, openai_api_key: str = None, lmnt_api_key: str = None):
@@ -160,6 +184,8 @@ class SmartStudentAIAgent:
             'warning_count': 0,
             'intervention_count': 0,
             'session_start': datetime.now(),
+            # Monotonic twin of session_start for durations; immune to wall-clock jumps
+            'session_start_monotonic': time.monotonic(),
             'total_study_time': 0,
             'total_distraction_time': 0,
             'browsing_patterns': {}
@@ -168,10 +194,32 @@ class SmartStudentAIAgent:
         # Browser monitor reference
         self.browser_monitor = None
         
+        # Recent activity rows pushed by the browser monitor, oldest first
+        self._activity_ring = deque(maxlen=512)
+        
         # Speech feedback settings
         self.last_speech_time = None
         self.speech_cooldown = SPEECH_COOLDOWN
         self.speech_count = 0
+        # Open LMNT clients keyed by event loop; each keeps its HTTP session alive between calls
+        self._speech_clients = {}
+        # Syntheses in flight per LMNT client, and clients retired after a connection error
+        # that get closed once their last synthesis finishes
+        self._speech_client_users = {}
+        self._retired_speech_clients = set()
+        # Recent emotion messages: (recommendation, page type, emotion, url, title) -> (message, created)
+        self._emotion_message_cache = OrderedDict()
+        
+        # Background event loop that runs all speech feedback, started on first use
+        self._speech_loop = None
+        self._speech_loop_lock = threading.Lock()
+        
+        # ai_analysis.csv is opened once and appended to for the whole session; rows
+        # saved after close() are dropped rather than reopening the file
+        self._analysis_log_file = None
+        self._analysis_log_writer = None
+        self._analysis_log_closed = False
+        self._analysis_log_lock = threading.Lock()
         
     def encode_image_for_vision(self, image_path: str) -> str:
         """Encode image to base64 for vision API"""
@@ -232,7 +280,7 @@ class SmartStudentAIAgent:
                 end = content.rfind('}') + 1
                 if start != -1 and end != 0:
                     json_str = content[start:end]
-                    analysis = json.loads(json_str)
+                    analysis = json_loads(json_str)
                 else:
                     # Fallback if no JSON found
                     analysis = {
@@ -264,6 +312,72 @@ class SmartStudentAIAgent:
                 "action_needed": "manual_review"
             }
     
+    def analyze_screenshots_batch(self, screenshot_paths: List[str]) -> List[Dict[str, Any]]:
+        """Analyze several screenshots with a single GPT-4 Vision request"""
+        if len(screenshot_paths) <= 1:
+            return [self.analyze_screenshot(path) for path in screenshot_paths]
+        
+        results = [None] * len(screenshot_paths)
+        images = []
+        for i, path in enumerate(screenshot_paths):
+            base64_image = self.encode_image_for_vision(path)
+            if base64_image is None:
+                results[i] = {
+                    "inappropriate": False,
+                    "category": "analysis_error",
+                    "confidence": 0.0,
+                    "description": f"Error analyzing screenshot: could not read {path}",
+                    "action_needed": "manual_review"
+                }
+            else:
+                images.append((i, base64_image))
+        
+        if images:
+            content = [{
+                "type": "text",
+                "text": f"""Analyze each of the following {len(images)} screenshots, in order, and determine if it contains inappropriate content for a student monitoring system.
+                
+                Look for:
+                - Adult/explicit content
+                - Violence or disturbing imagery
+                - Gambling or betting sites
+                - Social media during study time
+                - Gaming or entertainment sites during study time
+                - Any content that would be inappropriate for educational purposes
+                
+                Respond with a JSON array of {len(images)} objects, one per screenshot in the order given, each containing:
+                {{
+                    "inappropriate": true/false,
+                    "category": "category of content if inappropriate",
+                    "confidence": 0.0-1.0,
+                    "description": "brief description of what you see",
+                    "action_needed": "suggested action if inappropriate"
+                }}"""
+            }]
+            for _, base64_image in images:
+                content.append({
+                    "type": "image_url",
+                    "image_url": {
+                        "url": f"data:image/png;base64,{base64_image}",
+                        "detail": "high"
+                    }
+                })
+            
+            try:
+                response = self.llm.invoke([HumanMessage(content=content)])
+                text = response.content
+                batch = json_loads(text[text.find('['):text.rfind(']') + 1])
+                if not isinstance(batch, list) or len(batch) != len(images):
+                    raise ValueError(f"expected {len(images)} analyses")
+                for (i, _), analysis in zip(images, batch):
+                    results[i] = analysis
+            except Exception as e:
+                print(f"Batched screenshot analysis failed, analyzing individually: {e}")
+                for i, _ in images:
+                    results[i] = self.analyze_screenshot(screenshot_paths[i])
+        
+        return results
+    
     def analyze_browsing_patterns(self, recent_activity: List[Dict]) -> Dict[str, Any]:
         """Analyze student's browsing patterns and history"""
         if not recent_activity:
@@ -331,12 +445,10 @@ class SmartStudentAIAgent:
             print(f"Error analyzing browsing patterns: {e}")
             return {"pattern": "analysis_error", "trend": "neutral", "focus_score": 5}
     
-    def make_intelligent_decision(self, current_activity: Dict, screenshot_analysis: Dict, 
-                                pattern_analysis: Dict, time_on_site: float) -> Dict[str, Any]:
-        """Use AI to make intelligent decisions about student intervention"""
-        
-        # Create comprehensive context for AI decision making
-        context = f"""
+    def build_decision_context(self, current_activity: Dict, screenshot_analysis: Dict,
+                               pattern_analysis: Dict, time_on_site: float) -> str:
+        """Describe one activity window for the decision prompt"""
+        return f"""
         STUDENT MONITORING CONTEXT:
         
         Current Activity:
@@ -363,10 +475,11 @@ class SmartStudentAIAgent:
         - Total encouragements: {self.student_activity['encouragement_count']}
         - Total warnings: {self.student_activity['warning_count']}
         - Total interventions: {self.student_activity['intervention_count']}
-        - Session duration: {(datetime.now() - self.student_activity['session_start']).total_seconds() / 60:.1f} minutes
+        - Session duration: {self.get_session_minutes():.1f} minutes
         """
-        
-        # Check for immediate inappropriate content
+    
+    def immediate_intervention(self, current_activity: Dict) -> Dict[str, Any]:
+        """Return an intervention decision if the activity is clearly inappropriate, else None"""
         inappropriate_content = self.check_for_inappropriate_content(current_activity)
         if inappropriate_content:
             return {
@@ -377,6 +490,29 @@ class SmartStudentAIAgent:
                 'urgency': 'high',
                 'emotion': False
             }
+        return None
+    
+    def validate_decision(self, decision: Dict[str, Any]) -> Dict[str, Any]:
+        """Fill in defaults for any invalid or missing fields in a model decision"""
+        if decision.get('recommendation') not in ['encourage', 'warn', 'intervene']:
+            decision['recommendation'] = 'warn'
+        if not isinstance(decision.get('timeout'), (int, float)) or decision['timeout'] < 0:
+            decision['timeout'] = 30
+        if not decision.get('message'):
+            decision['message'] = "Keep up the good work with your studies!"
+        return decision
+    
+    def make_intelligent_decision(self, current_activity: Dict, screenshot_analysis: Dict, 
+                                pattern_analysis: Dict, time_on_site: float) -> Dict[str, Any]:
+        """Use AI to make intelligent decisions about student intervention"""
+        
+        # Create comprehensive context for AI decision making
+        context = self.build_decision_context(current_activity, screenshot_analysis, pattern_analysis, time_on_site)
+        
+        # Check for immediate inappropriate content
+        immediate = self.immediate_intervention(current_activity)
+        if immediate:
+            return immediate
         
         # Use AI to make nuanced decision
         decision_prompt = f"""
@@ -415,23 +551,80 @@ class SmartStudentAIAgent:
         
         try:
             response = self.text_llm.invoke([HumanMessage(content=decision_prompt)])
-            decision = json.loads(response.content)
+            decision = json_loads(response.content)
             
             # Validate and set defaults
-            if decision.get('recommendation') not in ['encourage', 'warn', 'intervene']:
-                decision['recommendation'] = 'warn'
-            if not isinstance(decision.get('timeout'), (int, float)) or decision['timeout'] < 0:
-                decision['timeout'] = 30
-            if not decision.get('message'):
-                decision['message'] = "Keep up the good work with your studies!"
-                
-            return decision
+            return self.validate_decision(decision)
             
         except Exception as e:
             print(f"Error in AI decision making: {e}")
             # Fallback to simple rule-based decision
             return self.fallback_decision(screenshot_analysis, time_on_site)
     
+    def make_intelligent_decisions_batch(self, items: List[Tuple[Dict, Dict, Dict, float]]) -> List[Dict[str, Any]]:
+        """Decide on several activity windows with a single model call.
+        
+        Each item is (current_activity, screenshot_analysis, pattern_analysis, time_on_site).
+        """
+        decisions = [self.immediate_intervention(item[0]) for item in items]
+        pending = [i for i, decision in enumerate(decisions) if decision is None]
+        if not pending:
+            return decisions
+        
+        contexts = "\n".join(
+            f"--- WINDOW {n} ---\n{self.build_decision_context(*items[i])}"
+            for n, i in enumerate(pending, 1)
+        )
+        decision_prompt = f"""
+        You are an intelligent tutoring system monitoring a student's computer activity. Below are {len(pending)} consecutive monitoring windows. Make a QUICK decision about how to respond to each one.
+        
+        {contexts}
+        
+        For each window, decide between three actions:
+        1. ENCOURAGE: Student is doing well, give positive reinforcement
+        2. WARN: Student is getting distracted, give gentle reminder
+        3. INTERVENE: Student needs redirection to educational content
+        
+        For each decision, consider:
+        - How long they've been on the current site
+        - Whether the content is educational or distracting
+        - Their recent browsing patterns
+        - Previous interventions, including ones you chose for earlier windows (avoid being too pushy)
+        
+        Provide your response as a JSON array with exactly {len(pending)} objects, in window order, each with:
+        {{
+            "recommendation": "encourage|warn|intervene",
+            "timeout": <seconds to wait before this action>,
+            "message": "<brief, personalized message for the student>",
+            "reasoning": "<brief explanation of your decision>",
+            "urgency": "low|medium|high",
+            "emotion": false
+        }}
+        
+        IMPORTANT - Keep timeouts SHORT for faster responses:
+        - ENCOURAGE: Educational content, focused work (timeout: 3-10 seconds)
+        - WARN: Mild distraction, some off-task behavior (timeout: 5-15 seconds)  
+        - INTERVENE: Heavy distraction, inappropriate content (timeout: 0-5 seconds)
+        
+        Make each message brief, encouraging, and age-appropriate.
+        """
+        
+        try:
+            response = self.text_llm.invoke([HumanMessage(content=decision_prompt)])
+            content = response.content
+            batch = json_loads(content[content.find('['):content.rfind(']') + 1])
+            if not isinstance(batch, list) or len(batch) != len(pending):
+                raise ValueError(f"expected {len(pending)} decisions, got {len(batch) if isinstance(batch, list) else 'none'}")
+            for i, decision in zip(pending, batch):
+                decisions[i] = self.validate_decision(decision)
+        
+        except Exception as e:
+            print(f"Error in batched AI decision making: {e}")
+            for i in pending:
+                decisions[i] = self.fallback_decision(items[i][1], items[i][3])
+        
+        return decisions
+    
     def fallback_decision(self, screenshot_analysis: Dict, time_on_site: float) -> Dict[str, Any]:
         """Fallback rule-based decision if AI fails"""
         educational_value = screenshot_analysis.get('educational_value', 5)
@@ -497,10 +690,34 @@ class SmartStudentAIAgent:
             print(f"Error reading activity logs: {e}")
             return []
     
-    def analyze_student_behavior(self, recent_activity: List[Dict], use_fast_mode: bool = False) -> Dict[str, Any]:
-        """Main analysis function that coordinates all AI components"""
+    def record_activity(self, activity: Dict):
+        """Append one activity row to the in-memory activity buffer"""
+        self._activity_ring.append(activity)
+    
+    def get_buffered_activity(self, minutes: int = 10) -> List[Dict]:
+        """Get recent student activity from the in-memory buffer instead of logs.csv.
+        
+        Rows older than the window are dropped from the buffer as they age out, so
+        the buffer only ever holds the window last asked for. Call it from one
+        thread only.
+        """
+        cutoff_time = datetime.now() - timedelta(minutes=minutes)
+        ring = self._activity_ring
+        
+        # Rows arrive in time order, so expired ones are always at the left end
+        while ring and ring[0]['datetime'] < cutoff_time:
+            ring.popleft()
+        return list(ring)
+    
+    def prepare_analysis(self, recent_activity: List[Dict], use_fast_mode: bool = False) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """Run the cheap, local part of the analysis for one activity window.
+        
+        Returns (analysis, None) when no model call is needed, otherwise
+        (None, context) where context feeds the screenshot analysis and decision;
+        context['immediate'] is the immediate_intervention() decision, if any.
+        """
         if not recent_activity:
-            return {'status': 'no_activity', 'recommendation': 'continue_monitoring'}
+            return {'status': 'no_activity', 'recommendation': 'continue_monitoring'}, None
         
         # Get current activity
         latest_activity = recent_activity[-1]
@@ -543,25 +760,24 @@ class SmartStudentAIAgent:
                     'emotion': decision.get('emotion', False),
                     'ai_enhanced': False,
                     'fast_mode': True
-                }
-        
-        # Full AI analysis (use this as default now)
-        screenshot_path = latest_activity.get('screenshot_path', '')
+                }, None
         
-        # Run AI analyses
-        screenshot_analysis = self.analyze_screenshot(screenshot_path)
-        
-        # Make intelligent decision
-        decision = self.make_intelligent_decision(
-            latest_activity, screenshot_analysis, pattern_analysis, time_on_site
-        )
-        
-        # Compile comprehensive analysis
-        analysis = {
+        return None, {
+            'latest_activity': latest_activity,
             'current_url': current_url,
             'time_on_site': time_on_site,
-            'screenshot_analysis': screenshot_analysis,
             'pattern_analysis': pattern_analysis,
+            # Checked now so a batching caller can act on it without waiting for the batch
+            'immediate': self.immediate_intervention(latest_activity)
+        }
+    
+    def compile_analysis(self, context: Dict[str, Any], screenshot_analysis: Dict, decision: Dict) -> Dict[str, Any]:
+        """Combine a prepared context with its screenshot analysis and decision"""
+        return {
+            'current_url': context['current_url'],
+            'time_on_site': context['time_on_site'],
+            'screenshot_analysis': screenshot_analysis,
+            'pattern_analysis': context['pattern_analysis'],
             'recommendation': decision['recommendation'],
             'timeout': decision['timeout'],
             'message': decision['message'],
@@ -571,8 +787,65 @@ class SmartStudentAIAgent:
             'ai_enhanced': True,
             'fast_mode': False
         }
+    
+    def analyze_student_behavior(self, recent_activity: List[Dict], use_fast_mode: bool = False) -> Dict[str, Any]:
+        """Main analysis function that coordinates all AI components"""
+        analysis, context = self.prepare_analysis(recent_activity, use_fast_mode)
+        if analysis is not None:
+            return analysis
+        return self.complete_analysis(context)
+    
+    def complete_analysis(self, context: Dict[str, Any]) -> Dict[str, Any]:
+        """Run the model calls for one context returned by prepare_analysis"""
+        # Full AI analysis (use this as default now)
+        latest_activity = context['latest_activity']
+        screenshot_path = latest_activity.get('screenshot_path', '')
         
-        return analysis
+        # Run AI analyses
+        screenshot_analysis = self.analyze_screenshot(screenshot_path)
+        
+        # Make intelligent decision
+        decision = self.make_intelligent_decision(
+            latest_activity, screenshot_analysis, context['pattern_analysis'], context['time_on_site']
+        )
+        
+        # Compile comprehensive analysis
+        return self.compile_analysis(context, screenshot_analysis, decision)
+    
+    def analyze_student_behavior_batch(self, activity_windows: List[List[Dict]], use_fast_mode: bool = False) -> List[Dict[str, Any]]:
+        """Analyze several activity windows, sharing one vision call and one decision call.
+        
+        Windows that can be settled locally (no activity, fast mode) never reach
+        the model; the rest are sent together so the round-trip cost is paid once.
+        """
+        return self.complete_analyses_batch([
+            self.prepare_analysis(window, use_fast_mode) for window in activity_windows
+        ])
+    
+    def complete_analyses_batch(self, prepared: List[Tuple[Dict[str, Any], Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """Finish (analysis, context) pairs from prepare_analysis, in order.
+        
+        Call prepare_analysis as each window is captured, so site tracking and
+        time on site reflect that moment; only the model calls are deferred to here.
+        """
+        analyses = [analysis for analysis, _ in prepared]
+        pending = [(i, context) for i, (analysis, context) in enumerate(prepared) if analysis is None]
+        
+        if len(pending) == 1:
+            i, context = pending[0]
+            analyses[i] = self.complete_analysis(context)
+        elif pending:
+            screenshot_analyses = self.analyze_screenshots_batch(
+                [context['latest_activity'].get('screenshot_path', '') for _, context in pending]
+            )
+            decisions = self.make_intelligent_decisions_batch([
+                (context['latest_activity'], screenshot_analysis, context['pattern_analysis'], context['time_on_site'])
+                for (_, context), screenshot_analysis in zip(pending, screenshot_analyses)
+            ])
+            for (i, context), screenshot_analysis, decision in zip(pending, screenshot_analyses, decisions):
+                analyses[i] = self.compile_analysis(context, screenshot_analysis, decision)
+        
+        return analyses
     
     def check_for_inappropriate_content(self, activity: Dict) -> str:
         """Check for inappropriate content in search queries and page content"""
@@ -638,15 +911,8 @@ class SmartStudentAIAgent:
         speech_message = ""
         if self.speech_enabled:
             try:
-                # Run speech feedback asynchronously
-                loop = None
-                try:
-                    loop = asyncio.get_event_loop()
-                except RuntimeError:
-                    loop = asyncio.new_event_loop()
-                    asyncio.set_event_loop(loop)
-                
-                speech_given = loop.run_until_complete(self.give_speech_feedback(analysis))
+                # Run speech feedback on the shared speech loop and wait for it
+                speech_given = self.submit_speech_feedback(analysis).result()
                 if speech_given:
                     speech_message = getattr(self, '_last_speech_text', '')
                 
@@ -809,7 +1075,7 @@ class SmartStudentAIAgent:
             - Focus score: {pattern_analysis.get('focus_score', 5)}/10
             - Educational ratio: {pattern_analysis.get('educational_ratio', 0):.2f}
             - Site switches: {pattern_analysis.get('site_switches', 0)}
-            - Session duration: {(datetime.now() - self.student_activity['session_start']).total_seconds() / 60:.1f} minutes
+            - Session duration: {self.get_session_minutes():.1f} minutes
             
             Student Stats:
             - Encouragements received: {self.student_activity['encouragement_count']}
@@ -845,26 +1111,36 @@ class SmartStudentAIAgent:
                 'urgency': analysis.get('urgency', 'medium'),
                 'emotion': analysis.get('emotion', False),
                 'ai_enhanced': analysis.get('ai_enhanced', False),
-                'screenshot_analysis': json.dumps(analysis.get('screenshot_analysis', {})),
-                'pattern_analysis': json.dumps(analysis.get('pattern_analysis', {})),
+                'screenshot_analysis': json_dumps(analysis.get('screenshot_analysis', {})),
+                'pattern_analysis': json_dumps(analysis.get('pattern_analysis', {})),
                 'encouragement_count': self.student_activity['encouragement_count'],
                 'warning_count': self.student_activity['warning_count'],
                 'intervention_count': self.student_activity['intervention_count']
             }
             
-            # Save to CSV
-            log_file = "ai_analysis.csv"
-            file_exists = os.path.exists(log_file)
-            
-            with open(log_file, 'a', newline='', encoding='utf-8') as file:
-                writer = csv.DictWriter(file, fieldnames=log_entry.keys())
-                if not file_exists:
-                    writer.writeheader()
-                writer.writerow(log_entry)
+            # Save to CSV, opening the file on first use and keeping it open
+            with self._analysis_log_lock:
+                if self._analysis_log_closed:
+                    return
+                if self._analysis_log_writer is None:
+                    log_file = "ai_analysis.csv"
+                    file_exists = os.path.exists(log_file)
+                    self._analysis_log_file = open(log_file, 'a', newline='', encoding='utf-8')
+                    self._analysis_log_writer = csv.DictWriter(self._analysis_log_file, fieldnames=log_entry.keys())
+                    if not file_exists:
+                        self._analysis_log_writer.writeheader()
+                
+                self._analysis_log_writer.writerow(log_entry)
+                # Flush each row so anything reading the CSV mid-session sees it
+                self._analysis_log_file.flush()
                 
         except Exception as e:
             print(f"Error saving analysis log: {e}")
     
+    def get_session_minutes(self) -> float:
+        """Minutes elapsed since the session started"""
+        return (time.monotonic() - self.student_activity['session_start_monotonic']) / 60
+    
     def set_browser_monitor(self, browser_monitor):
         """Set the browser monitor instance for taking actions"""
         self.browser_monitor = browser_monitor
@@ -935,30 +1211,107 @@ class SmartStudentAIAgent:
             print("⚠️ LMNT SDK not available")
             return None
             
+        # Reuse this loop's LMNT client so repeat calls skip the TCP/TLS setup
+        speech = self.get_speech_client()
+        self._speech_client_users[speech] = self._speech_client_users.get(speech, 0) + 1
         try:
-            # Set API key as environment variable if not already set
-            if not os.getenv('LMNT_API_KEY'):
-                os.environ['LMNT_API_KEY'] = self.lmnt_api_key
+            synthesis = await speech.synthesize(text, self.lmnt_voice)
             
-            # Use the correct LMNT API pattern based on working example
-            async with Speech(api_key=self.lmnt_api_key) as speech:
-                synthesis = await speech.synthesize(text, self.lmnt_voice)
-                
-                # Handle different possible response formats
-                if hasattr(synthesis, 'audio'):
-                    audio_data = synthesis.audio
-                elif isinstance(synthesis, dict) and 'audio' in synthesis:
-                    audio_data = synthesis['audio']
-                else:
-                    # Try to access as bytes directly
-                    audio_data = synthesis
-                
-                print(f"✅ Speech synthesized successfully ({len(audio_data)} bytes)")
-                return audio_data
-                
+            # Handle different possible response formats
+            if hasattr(synthesis, 'audio'):
+                audio_data = synthesis.audio
+            elif isinstance(synthesis, dict) and 'audio' in synthesis:
+                audio_data = synthesis['audio']
+            else:
+                # Try to access as bytes directly
+                audio_data = synthesis
+            
+            print(f"✅ Speech synthesized successfully ({len(audio_data)} bytes)")
+            return audio_data
+        
+        except aiohttp.ClientConnectionError as e:
+            print(f"⚠️ Speech synthesis connection error: {e}")
+            # New calls get a fresh client; this one is closed once the other
+            # syntheses sharing it have finished
+            self._retire_speech_client(speech)
+            return None
         except Exception as e:
+            # Request-level failures (bad key, rate limit, ...) leave the shared session alone
             print(f"⚠️ Speech synthesis error: {e}")
             return None
+        finally:
+            users = self._speech_client_users.pop(speech) - 1
+            if users:
+                self._speech_client_users[speech] = users
+            elif speech in self._retired_speech_clients:
+                self._retired_speech_clients.discard(speech)
+                await speech.close()
+    
+    def _retire_speech_client(self, speech):
+        """Stop handing out this LMNT client; synthesize_speech closes it when its last user finishes"""
+        loop = asyncio.get_running_loop()
+        if self._speech_clients.get(loop) is speech:
+            del self._speech_clients[loop]
+        self._retired_speech_clients.add(speech)
+    
+    def get_speech_client(self):
+        """Return the LMNT client for the running event loop, creating it on first use.
+        
+        Call from a coroutine; callers on the same loop share the client with synthesize_speech.
+        """
+        loop = asyncio.get_running_loop()
+        speech = self._speech_clients.get(loop)
+        if speech is None:
+            # Forget clients whose loops are gone; their sessions can't be reused
+            for old_loop in [l for l in self._speech_clients if l.is_closed()]:
+                del self._speech_clients[old_loop]
+            speech = self._speech_clients[loop] = Speech(api_key=self.lmnt_api_key)
+        return speech
+    
+    def _get_speech_loop(self):
+        """Return the background speech event loop, starting its thread on first use"""
+        with self._speech_loop_lock:
+            if self._speech_loop is None:
+                self._speech_loop = asyncio.new_event_loop()
+                threading.Thread(target=self._speech_loop.run_forever, daemon=True).start()
+            return self._speech_loop
+    
+    def submit_speech_feedback(self, analysis: Dict[str, Any]):
+        """Schedule give_speech_feedback on the speech loop; returns a concurrent.futures.Future"""
+        return asyncio.run_coroutine_threadsafe(self.give_speech_feedback(analysis), self._get_speech_loop())
+    
+    async def close_speech_client(self):
+        """Close the running loop's LMNT client, if it has one; call before the loop shuts down"""
+        speech = self._speech_clients.pop(asyncio.get_running_loop(), None)
+        if speech is not None:
+            await speech.close()
+    
+    def close(self):
+        """Close the analysis log, any open LMNT connections and the speech loop"""
+        with self._analysis_log_lock:
+            self._analysis_log_closed = True
+            if self._analysis_log_file is not None:
+                self._analysis_log_file.close()
+                self._analysis_log_file = None
+                self._analysis_log_writer = None
+        
+        with self._speech_loop_lock:
+            speech_loop, self._speech_loop = self._speech_loop, None
+        if speech_loop is not None:
+            try:
+                asyncio.run_coroutine_threadsafe(self.close_speech_client(), speech_loop).result(timeout=5)
+            except Exception as e:
+                print(f"⚠️ Error closing speech client: {e}")
+            speech_loop.call_soon_threadsafe(speech_loop.stop)
+        
+        for loop, speech in list(self._speech_clients.items()):
+            if loop.is_closed() or loop.is_running():
+                continue
+            try:
+                loop.run_until_complete(speech.close())
+            except Exception as e:
+                print(f"⚠️ Error closing speech client: {e}")
+        self._speech_clients.clear()
     
     def play_speech(self, audio_data: bytes) -> bool:
         """Play synthesized speech audio with multiple fallback methods"""
@@ -1428,6 +1781,15 @@ class SmartStudentAIAgent:
         current_url = current_activity.get('url', 'an unknown page')
         current_title = current_activity.get('page_title', 'an unknown page')
 
+        # The same emotion on the same page gets the same message; skip the LLM call
+        # while a recent one is cached. History is left out of the key since it only
+        # colours the wording.
+        cache_key = (recommendation, context_type, primary_emotion, current_url, current_title)
+        cached = self._emotion_message_cache.get(cache_key)
+        if cached is not None and time.monotonic() - cached[1] < EMOTION_MESSAGE_TTL:
+            self._emotion_message_cache.move_to_end(cache_key)
+            return cached[0]
+
         history_summary = "The user has just started their session."
         if len(recent_activity) > 1:
             previous_sites = list(set(urlparse(act['url']).netloc for act in recent_activity[:-1]))
@@ -1457,6 +1819,10 @@ class SmartStudentAIAgent:
         try:
             response = self.text_llm.invoke([HumanMessage(content=prompt)])
             message = response.content.strip().replace('"', '')
+            self._emotion_message_cache[cache_key] = (message, time.monotonic())
+            self._emotion_message_cache.move_to_end(cache_key)
+            if len(self._emotion_message_cache) > EMOTION_MESSAGE_CACHE_SIZE:
+                self._emotion_message_cache.popitem(last=False)
             return message
         except Exception as e:
             print(f"Error generating emotion-based message: {e}")
@@ -29,10 +29,22 @@ class BrowserMonitor:
         self.driver = None
         self.headless = headless
         self.monitoring = False
+        # Set by stop_monitoring; the monitoring loop waits on it instead of sleeping
+        self._stop_event = threading.Event()
         self.log_queue = queue.Queue()
         self.screenshot_queue = queue.Queue()
         self.ocr_queue = queue.Queue()
         
+        # Callbacks that receive each logged activity row as a dict
+        self.activity_listeners = []
+        
+        # logs.csv is opened on the first logged row and kept open until close_browser;
+        # rows logged after that are dropped rather than reopening the file
+        self._log_file = None
+        self._log_writer = None
+        self._log_closed = False
+        self._log_lock = threading.Lock()
+        
         # Tracking variables
         self.last_url = ""
         self.last_title = ""
@@ -100,6 +112,20 @@ class BrowserMonitor:
             print(f"Error launching Firefox: {e}")
             return False
     
+    def get_browser_pids(self):
+        """PIDs of geckodriver and the Firefox it launched (empty before launch)"""
+        if not self.driver:
+            return []
+        
+        pids = []
+        process = getattr(self.driver.service, "process", None)
+        if process:
+            pids.append(process.pid)
+        firefox_pid = self.driver.capabilities.get("moz:processID")
+        if firefox_pid:
+            pids.append(int(firefox_pid))
+        return pids
+    
     def get_current_page_info(self):
         """Get current page URL, title, and other info"""
         if not self.driver:
@@ -224,20 +250,33 @@ class BrowserMonitor:
                 except Exception as e:
                     ocr_summary = f"OCR failed: {str(e)}"
             
-            # Log to CSV
-            with open("logs.csv", 'a', newline='', encoding='utf-8') as file:
-                writer = csv.writer(file)
-                writer.writerow([
-                    timestamp.strftime("%Y-%m-%d %H:%M:%S"),
-                    timestamp_seconds,
-                    current_url,
-                    current_title,
-                    screenshot_path,
-                    ocr_summary,
-                    tab_count,
-                    search_query,
-                    page_content
-                ])
+            activity = {
+                'timestamp': timestamp.strftime("%Y-%m-%d %H:%M:%S"),
+                'timestamp_seconds': timestamp_seconds,
+                'url': current_url,
+                'page_title': current_title,
+                'screenshot_path': screenshot_path,
+                'ocr_summary': ocr_summary,
+                'tab_count': tab_count,
+                'search_query': search_query,
+                'page_content': page_content
+            }
+            
+            # Log to CSV through a handle kept open for the session
+            with self._log_lock:
+                if self._log_closed:
+                    return
+                if self._log_writer is None:
+                    self._log_file = open("logs.csv", 'a', newline='', encoding='utf-8')
+                    self._log_writer = csv.writer(self._log_file)
+                self._log_writer.writerow(activity.values())
+                # Flush each row so report tools reading logs.csv see it right away
+                self._log_file.flush()
+            
+            # Hand the row to listeners so they don't have to re-read logs.csv
+            activity['datetime'] = timestamp
+            for listener in self.activity_listeners:
+                listener(activity)
             
             # Update tracking variables
             self.last_url = current_url
@@ -265,6 +304,10 @@ class BrowserMonitor:
                 print("Too many consecutive errors. Stopping monitoring.")
                 self.stop_monitoring()
     
+    def add_activity_listener(self, callback):
+        """Register a callback that is called with each logged activity row"""
+        self.activity_listeners.append(callback)
+    
     def extract_search_query(self, url: str) -> str:
         """Extract search query from search engine URLs"""
         try:
@@ -548,6 +591,7 @@ class BrowserMonitor:
             return
             
         self.monitoring = True
+        self._stop_event.clear()
         print(f"Started monitoring browser activity every {interval} seconds...")
         print("You can now browse normally - the system will track your activity.")
         print("Note: Heavy sites like YouTube may have limited screenshot/OCR functionality.")
@@ -560,7 +604,8 @@ class BrowserMonitor:
                     break
                 
                 self.log_activity()
-                time.sleep(interval)
+                if self._stop_event.wait(interval):
+                    break
                 
             except KeyboardInterrupt:
                 print("\nMonitoring stopped by user.")
@@ -568,11 +613,13 @@ class BrowserMonitor:
             except Exception as e:
                 print(f"Error during monitoring: {e}")
                 # Try to continue monitoring
-                time.sleep(interval)
+                if self._stop_event.wait(interval):
+                    break
     
     def stop_monitoring(self):
         """Stop monitoring"""
         self.monitoring = False
+        self._stop_event.set()
         print("Monitoring stopped.")
     
     def close_browser(self):
@@ -584,6 +631,13 @@ class BrowserMonitor:
                 print("Browser closed successfully.")
             except Exception as e:
                 print(f"Error closing browser: {e}")
+        
+        with self._log_lock:
+            self._log_closed = True
+            if self._log_file is not None:
+                self._log_file.close()
+                self._log_file = None
+                self._log_writer = None
 
 
 def main():
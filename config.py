@@ -22,6 +22,12 @@ LMNT_API_KEY = os.getenv("LMNT_API_KEY", "ak_GkxGopYg9FwhJaQkJ9huMC")
 # Monitoring Intervals
 BROWSER_INTERVAL = int(os.getenv("BROWSER_INTERVAL", "5"))
 AI_INTERVAL = int(os.getenv("AI_INTERVAL", "8"))
+# Number of AI ticks to collect before sending them to the model together
+# (1 = analyze every tick immediately)
+AI_BATCH_SIZE = max(1, int(os.getenv("AI_BATCH_SIZE", "1")))
+# Keep Firefox and geckodriver off the last two CPU cores, leaving them to the
+# monitor's own threads (Linux only)
+THREAD_AFFINITY = os.getenv("THREAD_AFFINITY", "false").lower() == "true"
 
 # Speech Configuration
 SPEECH_ENABLED = os.getenv("SPEECH_ENABLED", "true").lower() == "true"
@@ -58,6 +64,8 @@ def get_config_summary():
         "lmnt_api_key": "Set" if LMNT_API_KEY else "Using Default",
         "browser_interval": BROWSER_INTERVAL,
         "ai_interval": AI_INTERVAL,
+        "ai_batch_size": AI_BATCH_SIZE,
+        "thread_affinity": THREAD_AFFINITY,
         "speech_enabled": SPEECH_ENABLED,
         "headless_mode": HEADLESS_MODE
     }
\ No newline at end of file
@@ -60,16 +60,14 @@ def demo_combined_system():
     print("Note: Requires OpenAI API key.")
     
     try:
-        from student_monitor import StudentMonitor
+        from student_monitor import SmartStudentMonitor
         
-        monitor = StudentMonitor(headless=False)
+        monitor = SmartStudentMonitor(headless=False)
+        monitor.browser_interval = 5
+        monitor.ai_interval = 30
         
         print("Starting combined system...")
-        monitor.start_monitoring(
-            start_url="https://www.google.com",
-            monitor_interval=5,
-            agent_interval=30
-        )
+        monitor.start_monitoring()
         
     except Exception as e:
         print(f"Error: {e}")
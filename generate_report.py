@@ -333,11 +333,17 @@ def write_report(text):
     pdf.output(OUTPUT_DOC)
     print(f"Report saved to {OUTPUT_DOC} at {datetime.now(timezone.utc).isoformat()}Z")
 
-if __name__ == "__main__":
+def main():
+    """Generate the parent report. Returns False if there were no snapshots."""
     snaps = load_snapshots()
     if not snaps:
         print("No snapshots found. Exiting.")
-        exit(1)
+        return False
     prompt = build_prompt(snaps)
     report = call_gemini(prompt)
-    write_report(report)
\ No newline at end of file
+    write_report(report)
+    return True
+
+if __name__ == "__main__":
+    if not main():
+        exit(1)
\ No newline at end of file
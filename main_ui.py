@@ -9,6 +9,8 @@ from tkinter import ttk, filedialog
 import subprocess
 import sys
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import tkinter.messagebox as messagebox
 from PIL import Image, ImageTk  # Import Pillow
 
@@ -20,6 +22,13 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 ASSETS_DIR = os.path.join(BASE_DIR, "assets")
 
 
+def _load_resized_png(path, divisor):
+    """Decode a PNG and shrink it by `divisor` (safe to run off the Tk thread)"""
+    with Image.open(path) as img:
+        w, h = img.size
+        return img.resize((w // divisor, h // divisor), Image.Resampling.LANCZOS)
+
+
 class SimpleStudentMonitorGUI:
     def __init__(self, root):
         self.root = root
@@ -31,6 +40,10 @@ class SimpleStudentMonitorGUI:
         self.logo_image = None
         self.unlock_image = None
 
+        # Background report generation state
+        self._report_thread = None
+        self._report_error = None
+
         # Center the window
         self.center_window()
         
@@ -61,6 +74,17 @@ class SimpleStudentMonitorGUI:
             print("Fredoka font not found, using Segoe UI")
         
         BLUE_COLOR = "#38B6FF"
+
+        # Decode and resize the three icons in parallel; Pillow releases the GIL
+        # while decoding. PhotoImage objects are still created on the Tk thread.
+        logo_path = os.path.join(ASSETS_DIR, "logo.png")
+        unlock_path = os.path.join(ASSETS_DIR, "unlock.png")
+        report_icon_path = os.path.join(ASSETS_DIR, "report.png")
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            logo_future, unlock_future, report_future = [
+                executor.submit(_load_resized_png, path, divisor)
+                for path, divisor in [(logo_path, 2), (unlock_path, 3), (report_icon_path, 3)]
+            ]
         
         # Configure styles
         style = ttk.Style()
@@ -90,15 +114,9 @@ class SimpleStudentMonitorGUI:
 
         # Load logo image
         try:
-            logo_path = os.path.join(ASSETS_DIR, "logo.png")
             print(f"Attempting to load logo icon from: {logo_path}") # DEBUG
-            with Image.open(logo_path) as img:
-                print("Logo image opened successfully with Pillow.") # DEBUG
-                w, h = img.size
-                # Make it much smaller - resize to 1/15 of original size
-                img_resized = img.resize((w // 2, h // 2), Image.Resampling.LANCZOS)
-                self.logo_image = ImageTk.PhotoImage(img_resized)
-                print("Unlock ImageTk.PhotoImage created successfully.") # DEBUG
+            self.logo_image = ImageTk.PhotoImage(logo_future.result())
+            print("Logo ImageTk.PhotoImage created successfully.") # DEBUG
             logo_label = tk.Label(logo_frame, image=self.logo_image, bg="white", borderwidth=0)
             logo_label.image = self.logo_image  # Keep a reference!
             logo_label.pack(anchor="center")
@@ -115,14 +133,9 @@ class SimpleStudentMonitorGUI:
         unlock_frame.grid(row=0, column=1, pady=5, sticky="")
         
         try:
-            unlock_path = os.path.join(ASSETS_DIR, "unlock.png")
             print(f"Attempting to load unlock icon from: {unlock_path}") # DEBUG
-            with Image.open(unlock_path) as img:
-                print("Unlock image opened successfully with Pillow.") # DEBUG
-                w, h = img.size
-                img_resized = img.resize((w // 3, h // 3), Image.Resampling.LANCZOS)
-                self.unlock_image = ImageTk.PhotoImage(img_resized)
-                print("Unlock ImageTk.PhotoImage created successfully.") # DEBUG
+            self.unlock_image = ImageTk.PhotoImage(unlock_future.result())
+            print("Unlock ImageTk.PhotoImage created successfully.") # DEBUG
 
             unlock_button = tk.Button(unlock_frame, image=self.unlock_image, command=self.start_monitoring, borderwidth=0, bg="white", activebackground="white", cursor="hand2")
             unlock_button.image = self.unlock_image # Keep a reference!
@@ -138,14 +151,9 @@ class SimpleStudentMonitorGUI:
         report_frame.grid(row=0, column=2, pady=5, sticky="")
         
         try:
-            report_icon_path = os.path.join(ASSETS_DIR, "report.png")
             print(f"Attempting to load report icon from: {report_icon_path}") # DEBUG
-            with Image.open(report_icon_path) as img:
-                print("Report image opened successfully with Pillow.") # DEBUG
-                w, h = img.size
-                img_resized = img.resize((w // 3, h // 3), Image.Resampling.LANCZOS)
-                self.report_image = ImageTk.PhotoImage(img_resized)
-                print("Report ImageTk.PhotoImage created successfully.") # DEBUG
+            self.report_image = ImageTk.PhotoImage(report_future.result())
+            print("Report ImageTk.PhotoImage created successfully.") # DEBUG
 
             report_button = tk.Button(report_frame, image=self.report_image, command=self.generate_and_save_report, borderwidth=0, bg="white", activebackground="white", cursor="hand2")
             report_button.image = self.report_image # Keep a reference!
@@ -157,25 +165,39 @@ class SimpleStudentMonitorGUI:
             report_button.pack(pady=5)
         
     def generate_and_save_report(self):
-        """Generate the report and open a save dialog for the user."""
+        """Generate the report in the background, then open a save dialog for the user."""
+        if self._report_thread and self._report_thread.is_alive():
+            messagebox.showinfo("Generating Report", "The parent report is already being generated.")
+            return
+
+        messagebox.showinfo("Generating Report", "The parent report is being generated. This may take a moment...")
+
+        # Run generate_report in-process on a worker thread so the Tk mainloop stays responsive
+        self._report_error = None
+        self._report_thread = threading.Thread(target=self._run_report_generation, daemon=True)
+        self._report_thread.start()
+        self.root.after(100, self._poll_report_generation)
+
+    def _run_report_generation(self):
+        """Step 1 (worker thread): build parent_report.pdf via generate_report.main()"""
         try:
-            # Step 1: Run generate_report.py
-            messagebox.showinfo("Generating Report", "The parent report is being generated. This may take a moment...")
-            
-            # Use subprocess to run the script, hiding the console window on Windows
-            process = subprocess.run(
-                [sys.executable, "generate_report.py"],
-                capture_output=True,
-                text=True,
-                check=True,
-                creationflags=subprocess.CREATE_NO_WINDOW if sys.platform == "win32" else 0
-            )
-            
-            # Optional: print output for debugging
-            print(process.stdout)
-            if process.stderr:
-                print(process.stderr)
+            from generate_report import main as gen_report_main
+            if not gen_report_main():
+                self._report_error = "No activity snapshots were found to build the report from."
+        except Exception as e:
+            self._report_error = e
+
+    def _poll_report_generation(self):
+        """Wait for the report worker without blocking Tk, then save the report."""
+        if self._report_thread.is_alive():
+            self.root.after(100, self._poll_report_generation)
+            return
+
+        if self._report_error is not None:
+            messagebox.showerror("Error", f"Failed to generate report:\n{self._report_error}")
+            return
 
+        try:
             # Step 2: Check if parent_report.pdf was created
             report_path = os.path.join(BASE_DIR, "parent_report.pdf")
             if not os.path.exists(report_path):
@@ -200,8 +222,6 @@ class SimpleStudentMonitorGUI:
             
             messagebox.showinfo("Success", f"Report saved successfully to:\n{save_path}")
 
-        except subprocess.CalledProcessError as e:
-            messagebox.showerror("Error", f"Failed to generate report:\n{e.stderr}")
         except Exception as e:
             messagebox.showerror("Error", f"An unexpected error occurred:\n{e}")
 
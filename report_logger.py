@@ -78,6 +78,8 @@ import csv
 import json
 import os
 import glob
+import mmap
+import re
 from datetime import datetime
 
 AGENT_LOGS    = "agent_logs.csv"
@@ -85,33 +87,60 @@ EMOTION_LOG   = "emotionLog.txt"
 SCREENSHOT_DIR= "screenshots"
 OUTPUT_JSONL  = "format.jsonl"
 KEYS = ["angry", "disgust", "fear", "happy", "sad", "surprise", "neutral"]
+EMOTION_DECIMALS = 3
+
+# orjson encodes straight to bytes and is much faster than json.dumps; fall
+# back to the stdlib encoder if it isn't installed
+try:
+    import orjson
+
+    def dumps_line(record: dict) -> bytes:
+        return orjson.dumps(record) + b"\n"
+except ImportError:
+    def dumps_line(record: dict) -> bytes:
+        return (json.dumps(record) + "\n").encode("utf-8")
+
+def _parse_emotion_pairs(kvs: str) -> dict:
+    """
+    Parse the "k:v k:v ..." tail of an emotionLog.txt line into {emotion: value, …}
+    """
+    emo = {k: 0.0 for k in KEYS}
+    for kv in kvs.split():
+        if ":" not in kv:
+            continue
+        k, v = kv.split(":", 1)
+        try:
+            emo[k] = float(v)
+        except ValueError:
+            pass
+    return emo
+
+# Prefer the compiled parser (cythonize -i report_logger_fast.pyx) when it's built
+try:
+    from report_logger_fast import parse_emotion_pairs
+except ImportError:
+    parse_emotion_pairs = _parse_emotion_pairs
+
+# one emotionLog.txt record: "YYYY-MM-DD HH:MM:SS k:v k:v ...". A value ends at
+# whitespace or at the next record's timestamp, since the detector occasionally
+# drops a newline and runs two records together.
+_TS = rb"\d{4}-\d\d-\d\d \d\d:\d\d:\d\d"
+EMOTION_RECORD = re.compile(
+    rb"(" + _TS + rb")((?: \w+:\d+(?:\.\d+?)?(?=\s|" + _TS + rb"|\Z))+)"
+)
 
 def load_emotions():
     """
-    Parse emotionLog.txt, return a dict mapping datetime → {emotion: value, …}
+    Scan emotionLog.txt, yielding (datetime, {emotion: value, …}) in file
+    (i.e. timestamp) order
     """
-    emo_map = {}
-    with open(EMOTION_LOG, encoding="utf-8") as f:
-        for line in f:
-            line = line.strip()
-            if not line:
-                continue
-            parts = line.split()
-            # first two tokens are date and time
-            ts_str = " ".join(parts[:2])
-            dt = datetime.strptime(ts_str, "%Y-%m-%d %H:%M:%S")
-            # remaining tokens are k:v
-            emo = {k: 0.0 for k in KEYS}
-            for kv in parts[2:]:
-                if ":" not in kv:
-                    continue
-                k, v = kv.split(":", 1)
-                try:
-                    emo[k] = float(v)
-                except ValueError:
-                    pass
-            emo_map[dt] = emo
-    return emo_map
+    if not os.path.getsize(EMOTION_LOG):
+        return  # mmap can't map an empty file
+    with open(EMOTION_LOG, "rb") as f, \
+         mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        for m in EMOTION_RECORD.finditer(mm):
+            dt = datetime.strptime(m.group(1).decode("ascii"), "%Y-%m-%d %H:%M:%S")
+            yield dt, parse_emotion_pairs(m.group(2).decode("utf-8"))
 
 def find_screenshot(dt: datetime) -> str | None:
     """
@@ -130,16 +159,24 @@ def find_screenshot(dt: datetime) -> str | None:
     return None
 
 def build_jsonl():
+    # both logs are time-ordered, so walk them together (merge-join) and
+    # attach the latest emotion reading at or before each CSV row
     emotions = load_emotions()
+    next_emo = next(emotions, None)
+    emo = {}
     # open CSV and JSONL
     with open(AGENT_LOGS, newline="", encoding="utf-8") as csvf, \
-         open(OUTPUT_JSONL, "w", encoding="utf-8") as out:
+         open(OUTPUT_JSONL, "wb") as out:
 
         reader = csv.DictReader(csvf)
         for row in reader:
             dt = datetime.strptime(row["timestamp"], "%Y-%m-%d %H:%M:%S")
-            
-            emo = emotions.get(dt, {})
+
+            while next_emo is not None and next_emo[0] <= dt:
+                # the detector's scores carry far more digits than they mean;
+                # 3 decimals keeps format.jsonl compact
+                emo = {k: round(v, EMOTION_DECIMALS) for k, v in next_emo[1].items()}
+                next_emo = next(emotions, None)
 
             # find the screenshot filename
             shot = find_screenshot(dt)
@@ -159,7 +196,7 @@ def build_jsonl():
                 "emotion":            emo
             }
 
-            out.write(json.dumps(record) + "\n")
+            out.write(dumps_line(record))
             print(f"Wrote JSONL for {row['timestamp']} → screenshot={shot}, emotion_keys={list(emo)}")
 
 if __name__ == "__main__":
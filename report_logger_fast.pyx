@@ -0,0 +1,37 @@
+# cython: language_level=3, boundscheck=False, wraparound=False
+# distutils: define_macros = CYTHON_ASSUME_SAFE_MACROS=1 CYTHON_USE_PYLONG_INTERNALS=1
+# distutils: extra_compile_args = -O3 -march=native
+"""
+Compiled emotion parsing for report_logger.py
+
+Build in place with:
+    cythonize -i report_logger_fast.pyx
+
+report_logger falls back to its pure-Python parser if this module isn't built.
+"""
+
+KEYS = ("angry", "disgust", "fear", "happy", "sad", "surprise", "neutral")
+
+
+cpdef dict parse_emotion_pairs(str kvs):
+    """
+    Parse the "k:v k:v ..." tail of an emotionLog.txt line into {emotion: value, …}
+    """
+    cdef dict emo = dict.fromkeys(KEYS, 0.0)
+    cdef list tokens = kvs.split()
+    cdef Py_ssize_t i, n = len(tokens)
+    cdef Py_ssize_t sep
+    cdef str kv
+    cdef double v
+
+    for i in range(n):
+        kv = <str>tokens[i]
+        sep = kv.find(":")
+        if sep < 0:
+            continue
+        try:
+            v = float(kv[sep + 1:])
+        except ValueError:
+            continue
+        emo[kv[:sep]] = v
+    return emo
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Shared helpers for the speech test scripts
+Can cache synthesized audio (SPEECH_TEST_CACHE=true) so re-runs and repeated
+phrases skip the LMNT API
+"""
+
+import asyncio
+import contextlib
+import functools
+import hashlib
+import os
+import tempfile
+from collections import OrderedDict
+
+# Run the tests on uvloop's faster event loop when it's installed
+try:
+    from uvloop import run as run_async
+except ImportError:
+    run_async = asyncio.run
+
+# Serve repeat phrases from memory and lmnt_test_cache/ only when asked: by default
+# every run calls LMNT, so the tests still catch a broken key or endpoint
+SPEECH_TEST_CACHE = os.getenv("SPEECH_TEST_CACHE", "false").lower() == "true"
+
+# Synthesized audio keyed by (voice, text), most recently used last
+TTS_CACHE_SIZE = 1000
+TTS_CACHE_DIR = "lmnt_test_cache"
+_TTS_CACHE = OrderedDict()
+# Syntheses already in flight, so concurrent requests for the same phrase share one call
+_TTS_PENDING = {}
+
+
+@functools.lru_cache(maxsize=1)
+def get_agent():
+    """The SmartStudentAIAgent shared by every speech test"""
+    from ai_agent import SmartStudentAIAgent
+    return SmartStudentAIAgent()
+
+
+async def get_lmnt():
+    """The running loop's LMNT client, shared with the agent's own syntheses"""
+    return get_agent().get_speech_client()
+
+
+async def close_lmnt():
+    """Close the running loop's LMNT client; call before the loop shuts down"""
+    # Nothing to close if the agent was never created
+    if get_agent.cache_info().currsize:
+        await get_agent().close_speech_client()
+
+
+@contextlib.contextmanager
+def atomic_open(path):
+    """Open a temp file beside path for binary writing; it replaces path only once fully written"""
+    # Same directory as the target, so os.replace never has to cross filesystems
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            yield f
+        os.replace(tmp_path, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.unlink(tmp_path)
+        raise
+
+
+def _cache_path(key):
+    """Disk cache file for a (voice, text) key"""
+    digest = hashlib.sha1("\0".join(key).encode("utf-8")).hexdigest()
+    return os.path.join(TTS_CACHE_DIR, f"{digest}.mp3")
+
+
+def _remember(key, audio_data):
+    """Store audio in the in-memory cache, evicting the oldest entry when full"""
+    _TTS_CACHE[key] = audio_data
+    _TTS_CACHE.move_to_end(key)
+    if len(_TTS_CACHE) > TTS_CACHE_SIZE:
+        _TTS_CACHE.popitem(last=False)
+
+
+async def _synthesize_and_store(agent, key, text):
+    """Synthesize through the agent and, with caching on, save the result to both cache tiers"""
+    audio_data = await agent.synthesize_speech(text)
+    if audio_data and SPEECH_TEST_CACHE:
+        _remember(key, audio_data)
+        try:
+            os.makedirs(TTS_CACHE_DIR, exist_ok=True)
+            # A half-written file would be served as audio on every later run
+            with atomic_open(_cache_path(key)) as f:
+                f.write(audio_data)
+        except OSError as e:
+            print(f"⚠️ Could not write speech cache: {e}")
+    return audio_data
+
+
+async def cached_synthesize(agent, text, voice=None):
+    """agent.synthesize_speech(text), served from memory or disk when caching is on.
+    
+    Returns (audio_data, from_cache) so callers can tell a cache hit from a real LMNT call.
+    """
+    key = (voice or agent.lmnt_voice, text)
+
+    if SPEECH_TEST_CACHE:
+        audio_data = _TTS_CACHE.get(key)
+        if audio_data is not None:
+            _TTS_CACHE.move_to_end(key)
+            return audio_data, True
+
+        # Earlier runs leave their audio on disk
+        path = _cache_path(key)
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                audio_data = f.read()
+            _remember(key, audio_data)
+            return audio_data, True
+
+    task = _TTS_PENDING.get(key)
+    if task is None:
+        task = asyncio.ensure_future(_synthesize_and_store(agent, key, text))
+        _TTS_PENDING[key] = task
+        task.add_done_callback(lambda _: _TTS_PENDING.pop(key, None))
+    return await asyncio.shield(task), False
+
+
+def start_syntheses(agent, messages, limit=4):
+    """Start synthesizing every message over the shared LMNT session.
+    
+    Returns one task per message, in order, each resolving to (audio_data, from_cache).
+    """
+    semaphore = asyncio.Semaphore(limit)
+
+    async def synthesize(message):
+        async with semaphore:
+            return await cached_synthesize(agent, message)
+
+    return [asyncio.ensure_future(synthesize(message)) for message in messages]
+
+
+async def batch_synthesize(agent, messages, limit=4):
+    """Synthesize every message concurrently; (audio_data, from_cache) results keep message order"""
+    return await asyncio.gather(*start_syntheses(agent, messages, limit))
@@ -7,22 +7,145 @@ Enhanced with Smart AI Analysis
 
 import os
 import sys
-import time
 import threading
+import queue
+import signal
 import argparse
 from datetime import datetime
-import ast
-import asyncio
+from types import MappingProxyType
 
 # Import configuration
 from config import (
     OPENAI_API_KEY, LMNT_API_KEY, BROWSER_INTERVAL, AI_INTERVAL,
-    HEADLESS_MODE, validate_config, get_config_summary
+    AI_BATCH_SIZE, THREAD_AFFINITY, HEADLESS_MODE
 )
 
-# Import our modules
-from browser_monitor_fixed import BrowserMonitor
-from ai_agent import SmartStudentAIAgent
+# BrowserMonitor and SmartStudentAIAgent pull in Selenium, LangChain and
+# pandas, so they are imported where they are used to keep --help and
+# --config fast
+
+SESSION_REPORT_TEMPLATE = """
+🎓 SMART MONITORING SESSION REPORT
+""" + "=" * 50 + """
+📅 Session Date: {session_date}
+⏱️ Session Duration: {session_duration:.1f} minutes
+
+📈 AI ANALYSIS SUMMARY:
+{progress_report}
+
+📊 SESSION STATISTICS:
+• Encouragements Given: {encouragement_count}
+• Warnings Issued: {warning_count}
+• Interventions Performed: {intervention_count}
+
+💡 SYSTEM FEATURES USED:
+• Computer Vision Analysis ✅
+• Intelligent Decision Making ✅
+• Dynamic Timeout Adjustment ✅
+• Contextual Messaging ✅
+• Pattern Recognition ✅
+
+📁 LOG FILES CREATED:
+• Browser Activity: logs.csv
+• AI Analysis: ai_analysis.csv
+• Screenshots: screenshots/ directory
+            """
+
+# Emotion scores above this count as "high" for the triggers below
+HAPPY_THRESHOLD = 500
+NEGATIVE_THRESHOLD = 500
+
+# Emotion overrides keyed by (happy high, negative high, page category):
+# (recommendation, reasoning, urgency). Combinations not listed, including
+# both emotions high at once, leave the AI's analysis alone.
+EMOTION_TRIGGERS = {
+    (True, False, 'educational'): (
+        'encourage', "High happiness detected while on an educational page.", "low"),
+    (True, False, 'entertainment'): (
+        'intervene', "High happiness detected on an entertainment page. Redirecting to maintain productivity.", "medium"),
+    (False, True, 'educational'): (
+        'warn', "High negative emotions on an educational page. Offering a different resource.", "high"),
+    (False, True, 'entertainment'): (
+        'warn', "High negative emotions on an entertainment page. Suggesting a break.", "high"),
+    (True, False, 'general'): (
+        'warn', "Test Message", "low"),
+}
+
+# Bytes read from the end of emotionLog.txt to find its last line
+EMOTION_TAIL_BYTES = 4096
+
+STARTUP_BANNER = (
+    "\n🎯 Starting Smart Student Monitoring System\n"
+    + "=" * 50 + "\n"
+    "🔍 Computer Vision Analysis: ENABLED\n"
+    "🧠 Intelligent Decision Making: ENABLED\n"
+    "⏱️ Dynamic Timeouts: ENABLED\n"
+    "💬 Contextual Messages: ENABLED\n"
+    "📊 Pattern Analysis: ENABLED\n"
+    "🗣️ Speech Feedback: {speech_status}\n"
+    + "=" * 50 + "\n"
+)
+
+RUNNING_BANNER = (
+    "\n✅ All systems running!\n"
+    "📱 Browser Monitor: Active\n"
+    "🤖 AI Agent: Active\n"
+    "\n📋 Instructions:\n"
+    "• Browse normally - the system will monitor your activity\n"
+    "• AI will analyze screenshots and make intelligent decisions\n"
+    "• Notifications will appear based on AI analysis\n"
+    "• Press Ctrl+C to stop monitoring\n"
+)
+
+
+def page_category(educational_ratio):
+    """Map an educational ratio to 'educational', 'entertainment' or 'general'."""
+    # Pages at exactly 0.5 are neither educational nor entertainment
+    if educational_ratio > 0.5:
+        return 'educational'
+    if educational_ratio < 0.5:
+        return 'entertainment'
+    return 'general'
+
+
+def page_categories(educational_ratios):
+    """page_category() for a whole batch of ratios, compared in one pass with NumPy."""
+    if len(educational_ratios) < 2:
+        return [page_category(ratio) for ratio in educational_ratios]
+    # Imported here: NumPy is most of this module's import time and only batches need it
+    try:
+        import numpy as np
+    except ImportError:
+        return [page_category(ratio) for ratio in educational_ratios]
+    ratios = np.asarray(educational_ratios, dtype=float)
+    categories = np.where(ratios > 0.5, 'educational',
+                          np.where(ratios < 0.5, 'entertainment', 'general'))
+    return categories.tolist()
+
+
+def make_emotion_classifier(happy_threshold=HAPPY_THRESHOLD, negative_threshold=NEGATIVE_THRESHOLD):
+    """Build classify_emotions with its thresholds bound in the closure."""
+    get_trigger = EMOTION_TRIGGERS.get
+    
+    def classify_emotions(emotions, educational_ratio, category=None):
+        """Classify one emotion reading on a page.
+        
+        Returns (category, trigger) where category is 'educational', 'entertainment'
+        or 'general' and trigger is the matching EMOTION_TRIGGERS entry, or None.
+        Pass category when it was already worked out with page_categories().
+        """
+        if category is None:
+            category = page_category(educational_ratio)
+        happy = emotions.get('happy', 0)
+        negative_emotions = emotions.get('anger', 0) + emotions.get('sad', 0) + emotions.get('disgust', 0)
+        
+        trigger = get_trigger((happy > happy_threshold, negative_emotions > negative_threshold, category))
+        return category, trigger
+    
+    return classify_emotions
+
+
+classify_emotions = make_emotion_classifier()
 
 
 class SmartStudentMonitor:
@@ -32,7 +155,20 @@ class SmartStudentMonitor:
         self.openai_api_key = openai_api_key or OPENAI_API_KEY
         self.lmnt_api_key = lmnt_api_key or LMNT_API_KEY
         self.headless = headless if headless is not None else HEADLESS_MODE
-        self.running = False
+        # Set to stop every loop; waiting on it instead of sleeping lets threads exit immediately
+        self._stop = threading.Event()
+        # Set by the browser thread once Firefox is up (or has failed to start)
+        self.browser_ready = threading.Event()
+        # Last parsed emotionLog.txt entry, keyed by the file's (mtime_ns, size)
+        self._emotion_stat = None
+        self._emotion_cache = None
+        self._emotion_log_missing = False
+        # Page changes logged by the browser since the AI thread last looked
+        self._activity_queue = queue.Queue(maxsize=64)
+        # (url, title) of the last row passed to the AI thread
+        self._last_activity_page = None
+        # Analyses waiting for the action worker; None tells it to exit
+        self._action_queue = queue.Queue()
         
         # Initialize components
         self.browser_monitor = None
@@ -41,46 +177,75 @@ class SmartStudentMonitor:
         # Monitoring settings from config
         self.browser_interval = BROWSER_INTERVAL
         self.ai_interval = AI_INTERVAL
+        self.ai_batch_size = AI_BATCH_SIZE
         
     def get_last_emotion_log(self):
         """Reads the last entry from emotionLog.txt and parses it."""
         try:
-            with open("emotionLog.txt", "r") as f:
-                lines = f.readlines()
-                if not lines:
-                    return None
-                last_line = lines[-1].strip()
-                
-                # The format is "YYYY-MM-DD HH:MM:SS angry:X disgust:Y ..."
-                # We want to extract the emotion key-value pairs
-                parts = last_line.split()
-                if len(parts) < 3: # Should have at least timestamp (date and time) and one emotion
-                    return None
-                    
-                # Emotion data starts after the timestamp
-                emotion_data = parts[2:]
-                
-                emotions = {}
-                for item in emotion_data:
-                    try:
-                        key, value = item.split(':')
-                        emotions[key] = float(value)
-                    except ValueError:
-                        # Handle potential malformed key:value pairs
-                        continue
-                return emotions
+            # Reuse the last parse while the file hasn't been written to
+            st = os.stat("emotionLog.txt")
+            emotion_stat = (st.st_mtime_ns, st.st_size)
+            if emotion_stat == self._emotion_stat:
+                return self._emotion_cache
+            self._emotion_log_missing = False
+            
+            if st.st_size == 0:
+                # Nothing logged yet; no need to open it
+                emotions = None
+            else:
+                with open("emotionLog.txt", "rb") as f:
+                    # Only the last line matters, so read just the tail of the file
+                    f.seek(max(0, st.st_size - EMOTION_TAIL_BYTES))
+                    lines = f.read().decode("utf-8", errors="replace").splitlines()
+                    if not lines:
+                        emotions = None
+                    else:
+                        emotions = self._parse_emotion_line(lines[-1])
+            
+            self._emotion_stat = emotion_stat
+            self._emotion_cache = emotions
+            return emotions
 
         except FileNotFoundError:
-            print("⚠️ emotionLog.txt not found. Emotion analysis will be skipped.")
+            # Warn once, not on every AI tick, until the file shows up
+            if not self._emotion_log_missing:
+                print("⚠️ emotionLog.txt not found. Emotion analysis will be skipped.")
+                self._emotion_log_missing = True
+            self._emotion_stat = None
+            self._emotion_cache = None
             return None
         except Exception as e:
             print(f"⚠️ Error parsing emotionLog.txt: {e}")
             return None
 
+    def _parse_emotion_line(self, line):
+        """Parse one emotionLog.txt line into {emotion: value}, or None if it has no emotions"""
+        # The format is "YYYY-MM-DD HH:MM:SS angry:X disgust:Y ..."
+        # We want to extract the emotion key-value pairs
+        parts = line.split()
+        if len(parts) < 3: # Should have at least timestamp (date and time) and one emotion
+            return None
+            
+        # Emotion data starts after the timestamp
+        emotions = {}
+        for item in parts[2:]:
+            # partition splits once without building a list
+            key, sep, value = item.partition(':')
+            if not sep:
+                continue
+            try:
+                emotions[key] = float(value)
+            except ValueError:
+                # Handle potential malformed values (including extra colons)
+                continue
+        return emotions
+
     def initialize_components(self):
         """Initialize browser monitor and AI agent"""
         try:
             print("🚀 Initializing Smart Student Monitoring System...")
+            from browser_monitor_fixed import BrowserMonitor
+            from ai_agent import SmartStudentAIAgent
             
             # Initialize browser monitor
             print("📱 Starting browser monitor...")
@@ -96,6 +261,12 @@ class SmartStudentMonitor:
             # Connect browser monitor to AI agent
             self.ai_agent.set_browser_monitor(self.browser_monitor)
             
+            # Feed logged activity straight into the agent's buffer instead of re-reading logs.csv
+            for activity in self.ai_agent.get_recent_activity(minutes=10):
+                self.ai_agent.record_activity(activity)
+            self.browser_monitor.add_activity_listener(self.ai_agent.record_activity)
+            self.browser_monitor.add_activity_listener(self._on_browser_activity)
+            
             print("✅ All components initialized successfully!")
             return True
             
@@ -108,209 +279,344 @@ class SmartStudentMonitor:
         def browser_thread():
             try:
                 if self.browser_monitor.launch_firefox():
+                    self._restrict_browser_cores()
+                    self.browser_ready.set()
                     print(f"🌐 Browser monitoring started (interval: {self.browser_interval}s)")
                     self.browser_monitor.start_monitoring(interval=self.browser_interval)
                 else:
                     print("❌ Failed to launch browser")
-                    self.running = False
+                    self._stop.set()
             except Exception as e:
                 print(f"❌ Browser monitoring error: {e}")
-                self.running = False
+                self._stop.set()
+            finally:
+                # Never leave start_monitoring waiting on a browser that won't come up
+                self.browser_ready.set()
         
-        browser_thread_obj = threading.Thread(target=browser_thread, daemon=True)
+        browser_thread_obj = threading.Thread(target=self._stop_on_exit(browser_thread, "Browser"), daemon=True)
         browser_thread_obj.start()
         return browser_thread_obj
     
+    def process_analysis(self, analysis, recent_activity, category=None):
+        """Apply the emotion override to one analysis, log it and act on it.
+        
+        category is the page category when the caller already computed it.
+        Returns True if an action was queued.
+        """
+        # Emotion-based analysis override
+        emotions = self.get_last_emotion_log()
+        if emotions:
+            pattern_analysis = analysis.get('pattern_analysis', {})
+            educational_ratio = pattern_analysis.get('educational_ratio', 0.5)
+
+            category, trigger = classify_emotions(emotions, educational_ratio, category)
+            if trigger is not None:
+                recommendation, reasoning, urgency = trigger
+                analysis['recommendation'] = recommendation
+                analysis['message'] = self.ai_agent.generate_emotion_based_message(emotions, recommendation, category, recent_activity)
+                analysis['reasoning'] = reasoning
+                analysis['urgency'] = urgency
+                analysis['emotion'] = True
+                analysis['fast_mode'] = False # Ensure we can show messages
+                # Give verbal feedback for emotion-triggered events
+                if self.ai_agent.speech_enabled:
+                    # Hand it to the agent's speech loop so the AI thread isn't held up by TTS.
+                    # Nothing writes to the analysis after this point, so a read-only view
+                    # is enough; no copy needed.
+                    self.ai_agent.submit_speech_feedback(MappingProxyType(analysis))
+
+        # Save analysis to log
+        self.ai_agent.save_analysis_log(analysis)
+
+        # Take action if needed
+        recommendation = analysis.get('recommendation', 'continue_monitoring')
+        if recommendation == 'continue_monitoring':
+            return False
+
+        # Build the whole decision block and write it in one call
+        fast_mode = analysis.get('fast_mode', False)
+        mode_indicator = "⚡ FAST" if fast_mode else "🧠 FULL"
+        lines = [
+            f"\n🎯 AI Decision ({mode_indicator}): {recommendation.upper()}",
+            f"💬 Message: {analysis.get('message', 'N/A')}",
+            f"⏱️ Timeout: {analysis.get('timeout', 0)}s",
+            f"🔍 Reasoning: {analysis.get('reasoning', 'N/A')}",
+            f"⚡ Urgency: {analysis.get('urgency', 'medium')}",
+            f"💭 Emotion: {analysis.get('emotion', 'N/A')}",
+        ]
+
+        # Show screenshot analysis if available and not in fast mode
+        if fast_mode:
+            lines.append("📸 Screenshot: Skipped for faster response")
+        else:
+            screenshot_analysis = analysis.get('screenshot_analysis') or {}
+            description = screenshot_analysis.get('description', 'N/A')
+            if screenshot_analysis and description != 'No screenshot available':
+                lines.append(f"📸 Screenshot: {description}")
+                lines.append(f"📚 Educational value: {screenshot_analysis.get('educational_value', 0)}/10")
+                lines.append(f"📱 Distraction level: {screenshot_analysis.get('distraction_level', 0)}/10")
+
+        sys.stdout.write("\n".join(lines) + "\n")
+        sys.stdout.flush()
+
+        # Hand the action to the action worker so the AI loop keeps its cadence
+        self._action_queue.put_nowait(analysis)
+        return True
+    
+    def start_action_worker(self):
+        """Perform queued actions in a separate thread"""
+        # Fresh queue so a sentinel left by an earlier stop can't end this worker
+        self._action_queue = queue.Queue()
+        
+        def action_thread():
+            while True:
+                pending = [self._action_queue.get()]
+                # Drain anything else that queued up while the last action ran
+                while True:
+                    try:
+                        pending.append(self._action_queue.get_nowait())
+                    except queue.Empty:
+                        break
+                
+                # Keep only the newest analysis per URL so a long action can't build a backlog
+                latest = {}
+                for analysis in pending:
+                    if analysis is None:
+                        return
+                    latest.pop(analysis.get('current_url'), None)
+                    latest[analysis.get('current_url')] = analysis
+                
+                for analysis in latest.values():
+                    try:
+                        success = self.ai_agent.perform_action(analysis)
+                    except Exception as e:
+                        print(f"❌ Action error: {e}")
+                        continue
+                    if success:
+                        print(f"✅ Action completed successfully")
+                    else:
+                        print(f"❌ Action failed")
+        
+        action_thread_obj = threading.Thread(target=action_thread, daemon=True)
+        action_thread_obj.start()
+        return action_thread_obj
+    
     def start_ai_monitoring(self):
         """Start AI monitoring in a separate thread"""
         def ai_thread():
-            try:
-                print(f"🤖 AI monitoring started (interval: {self.ai_interval}s)")
-                
-                while self.running:
-                    try:
-                        # Get recent activity
-                        recent_activity = self.ai_agent.get_recent_activity(minutes=10)
-                        if recent_activity:
-                            # Perform AI analysis (using fast mode by default)
-                            analysis = self.ai_agent.analyze_student_behavior(recent_activity, use_fast_mode=True)
-                            
-                            # Emotion-based analysis override
-                            emotions = self.get_last_emotion_log()
-                            if emotions:
-                                pattern_analysis = analysis.get('pattern_analysis', {})
-                                educational_ratio = pattern_analysis.get('educational_ratio', 0.5)
-
-                                is_educational = educational_ratio > 0.5
-                                is_entertainment = educational_ratio < 0.5
-                                happy = emotions.get('happy', 0)
-                                negative_emotions = emotions.get('anger', 0) + emotions.get('sad', 0) + emotions.get('disgust', 0)
-
-                                emotion_triggered = False
-                                if happy > 500 and negative_emotions > 500:
-                                    emotion_triggered = False
-                                elif happy > 500 and is_educational:
-                                    analysis['recommendation'] = 'encourage'
-                                    analysis['message'] = self.ai_agent.generate_emotion_based_message(emotions, 'encourage', 'educational', recent_activity)
-                                    analysis['reasoning'] = "High happiness detected while on an educational page."
-                                    analysis['urgency'] = "low"
-                                    analysis['emotion'] = True
-                                    emotion_triggered = True
-                                elif happy > 500 and is_entertainment:
-                                    analysis['recommendation'] = 'intervene'
-                                    analysis['message'] = self.ai_agent.generate_emotion_based_message(emotions, 'intervene', 'entertainment', recent_activity)
-                                    analysis['reasoning'] = "High happiness detected on an entertainment page. Redirecting to maintain productivity."
-                                    analysis['urgency'] = "medium"
-                                    analysis['emotion'] = True
-                                    emotion_triggered = True
-                                elif negative_emotions > 500 and is_educational:
-                                    analysis['recommendation'] = 'warn'
-                                    analysis['message'] = self.ai_agent.generate_emotion_based_message(emotions, 'warn', 'educational', recent_activity)
-                                    analysis['reasoning'] = "High negative emotions on an educational page. Offering a different resource."
-                                    analysis['urgency'] = "high"
-                                    analysis['emotion'] = True
-                                    emotion_triggered = True
-                                elif negative_emotions > 500 and is_entertainment:
-                                    analysis['recommendation'] = 'warn'
-                                    analysis['message'] = self.ai_agent.generate_emotion_based_message(emotions, 'warn', 'entertainment', recent_activity)
-                                    analysis['reasoning'] = "High negative emotions on an entertainment page. Suggesting a break."
-                                    analysis['urgency'] = "high"
-                                    analysis['emotion'] = True
-                                    emotion_triggered = True
-                                elif happy > 500:
-                                    analysis['recommendation'] = 'warn'
-                                    analysis['message'] = self.ai_agent.generate_emotion_based_message(emotions, 'warn', 'general', recent_activity)
-                                    analysis['reasoning'] = "Test Message"
-                                    analysis['urgency'] = "low"
-                                    analysis['emotion'] = True
-                                    emotion_triggered = True
-                                
-                                if emotion_triggered:
-                                    analysis['fast_mode'] = False # Ensure we can show messages
-                                    # Give verbal feedback for emotion-triggered events
-                                    if self.ai_agent.speech_enabled:
-                                        # Run the async speech function in the current thread's event loop
-                                        try:
-                                            loop = asyncio.get_event_loop()
-                                        except RuntimeError:
-                                            loop = asyncio.new_event_loop()
-                                            asyncio.set_event_loop(loop)
-                                        
-                                        # Use the message from the analysis for speech
-                                        speech_analysis = analysis.copy()
-                                        loop.run_until_complete(self.ai_agent.give_speech_feedback(speech_analysis))
-
-                            # Save analysis to log
-                            self.ai_agent.save_analysis_log(analysis)
-                            
-                            # Take action if needed
-                            recommendation = analysis.get('recommendation', 'continue_monitoring')
-                            
-                            if recommendation != 'continue_monitoring':
-                                mode_indicator = "⚡ FAST" if analysis.get('fast_mode', False) else "🧠 FULL"
-                                print(f"\n🎯 AI Decision ({mode_indicator}): {recommendation.upper()}")
-                                print(f"💬 Message: {analysis.get('message', 'N/A')}")
-                                print(f"⏱️ Timeout: {analysis.get('timeout', 0)}s")
-                                print(f"🔍 Reasoning: {analysis.get('reasoning', 'N/A')}")
-                                print(f"⚡ Urgency: {analysis.get('urgency', 'medium')}")
-                                print(f"💭 Emotion: {analysis.get('emotion', 'N/A')}")
-                                
-                                # Show screenshot analysis if available and not in fast mode
-                                screenshot_analysis = analysis.get('screenshot_analysis', {})
-                                if screenshot_analysis and screenshot_analysis.get('description') != 'No screenshot available' and not analysis.get('fast_mode', False):
-                                    print(f"📸 Screenshot: {screenshot_analysis.get('description', 'N/A')}")
-                                    print(f"📚 Educational value: {screenshot_analysis.get('educational_value', 0)}/10")
-                                    print(f"📱 Distraction level: {screenshot_analysis.get('distraction_level', 0)}/10")
-                                elif analysis.get('fast_mode', False):
-                                    print(f"📸 Screenshot: Skipped for faster response")
-                                
-                                # Perform the action
-                                success = self.ai_agent.perform_action(analysis)
-                                if success:
-                                    print(f"✅ Action completed successfully")
-                                else:
-                                    print(f"❌ Action failed")
-                        
-                        # Wait before next analysis
-                        time.sleep(self.ai_interval)
-                        
-                    except Exception as inner_e:
-                        print(f"⚠️ AI monitoring error: {inner_e}")
-                        time.sleep(self.ai_interval)
-                        
-            except Exception as e:
-                print(f"❌ AI monitoring thread error: {e}")
-                self.running = False
+            print(f"🤖 AI monitoring started (interval: {self.ai_interval}s)")
+            
+            # Bind the per-tick lookups once; none of these change while monitoring
+            get_activity = self.ai_agent.get_buffered_activity
+            prepare_analysis = self.ai_agent.prepare_analysis
+            complete_batch = self.ai_agent.complete_analyses_batch
+            process_analysis = self.process_analysis
+            base_interval = self.ai_interval
+            batch_size = self.ai_batch_size
+            stop_wait = self._stop.wait
+            drain_activity = self._drain_activity_queue
+            
+            # Back off while the student is idle, tighten up while actions are firing
+            min_interval = min(base_interval, 5)
+            max_interval = max(base_interval, 60)
+            interval = base_interval
+            
+            pending_windows = []
+            # Wait before each analysis (returns early on shutdown)
+            while not stop_wait(interval):
+                try:
+                    # Only analyze when the browser has moved to a new page since the last tick
+                    if not drain_activity():
+                        interval = min(interval * 2, max_interval)
+                        continue
+                    
+                    # Prepare each window as it's captured (using fast mode by default) so
+                    # its site tracking is current; the model calls wait for a full batch
+                    recent_activity = get_activity(minutes=10)
+                    urgent = False
+                    if recent_activity:
+                        prepared = prepare_analysis(recent_activity, use_fast_mode=True)
+                        pending_windows.append((recent_activity, prepared))
+                        # Inappropriate content is acted on now, not once the batch fills
+                        urgent = prepared[1] is not None and prepared[1]['immediate'] is not None
+                        interval = min(interval, base_interval)
+                    
+                    if pending_windows and (urgent or len(pending_windows) >= batch_size):
+                        batch, pending_windows = pending_windows, []
+                        windows = [window for window, _ in batch]
+                        analyses = complete_batch([prepared for _, prepared in batch])
+                        # Categorize every page in the batch at once
+                        categories = page_categories([
+                            analysis.get('pattern_analysis', {}).get('educational_ratio', 0.5)
+                            for analysis in analyses
+                        ])
+                        acted = False
+                        for window, analysis, category in zip(windows, analyses, categories):
+                            acted = process_analysis(analysis, window, category) or acted
+                        if acted:
+                            interval = max(interval / 2, min_interval)
+                        else:
+                            interval = min(interval * 2, base_interval)
+                except Exception as inner_e:
+                    print(f"⚠️ AI monitoring error: {inner_e}")
         
-        ai_thread_obj = threading.Thread(target=ai_thread, daemon=True)
+        ai_thread_obj = threading.Thread(target=self._stop_on_exit(ai_thread, "AI"), daemon=True)
         ai_thread_obj.start()
         return ai_thread_obj
     
+    def _on_browser_activity(self, activity):
+        """Browser activity listener: tell the AI thread when the page has changed"""
+        # The browser logs a row every tick; only a new URL or title is new activity
+        page = (activity.get('url'), activity.get('page_title'))
+        if page == self._last_activity_page:
+            return
+        self._last_activity_page = page
+        
+        try:
+            self._activity_queue.put_nowait(activity)
+        except queue.Full:
+            # The AI thread only needs to know something happened; the rows themselves
+            # are already in the agent's activity buffer
+            pass
+    
+    def _drain_activity_queue(self):
+        """Empty the activity queue without blocking and return how many rows it held"""
+        count = 0
+        while True:
+            try:
+                self._activity_queue.get_nowait()
+            except queue.Empty:
+                return count
+            count += 1
+    
     def start_monitoring(self):
         """Start the complete monitoring system"""
         if not self.initialize_components():
             return False
         
-        self.running = True
+        self._stop.clear()
+        self.browser_ready.clear()
+        
+        # Ctrl+C sets the stop event directly so every thread wakes at once. Signal
+        # handlers can only be installed from the main thread; elsewhere the caller
+        # has to call stop_monitoring() itself.
+        previous_handler = None
+        if threading.current_thread() is threading.main_thread():
+            previous_handler = signal.signal(signal.SIGINT, self._handle_sigint)
         
         try:
-            print("\n🎯 Starting Smart Student Monitoring System")
-            print("=" * 50)
-            print("🔍 Computer Vision Analysis: ENABLED")
-            print("🧠 Intelligent Decision Making: ENABLED")  
-            print("⏱️ Dynamic Timeouts: ENABLED")
-            print("💬 Contextual Messages: ENABLED")
-            print("📊 Pattern Analysis: ENABLED")
             speech_status = "ENABLED" if self.ai_agent.speech_enabled else "DISABLED"
-            print(f"🗣️ Speech Feedback: {speech_status}")
-            print("=" * 50)
+            sys.stdout.write(STARTUP_BANNER.format(speech_status=speech_status))
             
             # Start browser monitoring thread
-            browser_thread = self.start_browser_monitoring()
+            self.start_browser_monitoring()
             
-            # Wait a moment for browser to start
-            time.sleep(3)
+            # Wait for the browser to come up before analyzing its activity, in
+            # one-second steps: a long lock wait can't be interrupted by Ctrl+C on Windows
+            for _ in range(30):
+                if self.browser_ready.wait(1):
+                    break
+            else:
+                raise RuntimeError("browser failed to start")
+            if self._stop.is_set():
+                return
             
             # Start AI monitoring thread
-            ai_thread = self.start_ai_monitoring()
+            self.start_action_worker()
+            self.start_ai_monitoring()
             
-            print(f"\n✅ All systems running!")
-            print(f"📱 Browser Monitor: Active")
-            print(f"🤖 AI Agent: Active")
-            print(f"\n📋 Instructions:")
-            print(f"• Browse normally - the system will monitor your activity")
-            print(f"• AI will analyze screenshots and make intelligent decisions")
-            print(f"• Notifications will appear based on AI analysis")
-            print(f"• Press Ctrl+C to stop monitoring")
+            sys.stdout.write(RUNNING_BANNER)
             
-            # Keep the main thread alive
-            while self.running:
-                time.sleep(1)
-                
-                # Check if threads are still alive
-                if not browser_thread.is_alive():
-                    print("⚠️ Browser thread stopped")
-                    break
-                if not ai_thread.is_alive():
-                    print("⚠️ AI thread stopped")
-                    break
+            # Keep the main thread alive until a stop is requested or a worker thread exits;
+            # the timeout keeps Ctrl+C deliverable on Windows, and set() still wakes it at once
+            while not self._stop.wait(1):
+                pass
                     
         except KeyboardInterrupt:
+            # Safety net for a Ctrl+C that lands before the handler is installed
             print("\n\n👋 Monitoring stopped by user")
         except Exception as e:
             print(f"\n❌ Monitoring error: {e}")
         finally:
+            if previous_handler is not None:
+                signal.signal(signal.SIGINT, previous_handler)
             self.stop_monitoring()
     
+    def _handle_sigint(self, signum, frame):
+        """SIGINT handler installed by start_monitoring"""
+        print("\n\n👋 Monitoring stopped by user")
+        self._stop.set()
+    
+    def _stop_on_exit(self, target, name):
+        """Wrap a thread target so the stop event is set as soon as it returns or raises"""
+        def run():
+            try:
+                target()
+            finally:
+                if not self._stop.is_set():
+                    print(f"⚠️ {name} thread stopped")
+                    self._stop.set()
+        
+        return run
+    
+    def _restrict_browser_cores(self):
+        """Move Firefox and geckodriver off the last two CPUs when THREAD_AFFINITY is on.
+        
+        The browser processes are restricted rather than our own threads, since the
+        OCR (tesseract) and audio player subprocesses would inherit a pinned thread's mask.
+        """
+        if not THREAD_AFFINITY or not hasattr(os, 'sched_setaffinity'):
+            return
+        
+        # Need at least one core left over for the browser
+        cores = sorted(os.sched_getaffinity(0))
+        if len(cores) < 3:
+            return
+        
+        browser_cores = set(cores[:-2])
+        # Content processes Firefox starts later inherit its mask; catch the ones already running
+        pids = []
+        for pid in self.browser_monitor.get_browser_pids():
+            pids.append(pid)
+            pids.extend(self._child_pids(pid))
+        
+        restricted = 0
+        for pid in pids:
+            try:
+                os.sched_setaffinity(pid, browser_cores)
+                restricted += 1
+            except OSError as e:
+                print(f"⚠️ Could not set CPU affinity for process {pid}: {e}")
+        if restricted:
+            print(f"📌 Browser processes limited to CPUs {sorted(browser_cores)}")
+    
+    @staticmethod
+    def _child_pids(pid):
+        """All descendants of pid, read from /proc (empty when that isn't available)"""
+        children = []
+        try:
+            with open(f"/proc/{pid}/task/{pid}/children") as f:
+                direct = [int(child) for child in f.read().split()]
+        except (OSError, ValueError):
+            return children
+        for child in direct:
+            children.append(child)
+            children.extend(SmartStudentMonitor._child_pids(child))
+        return children
+    
     def stop_monitoring(self):
         """Stop all monitoring"""
         print("\n🛑 Stopping monitoring system...")
-        self.running = False
+        self._stop.set()
+        self._action_queue.put(None)
         
         if self.browser_monitor:
             self.browser_monitor.stop_monitoring()
             self.browser_monitor.close_browser()
         
+        if self.ai_agent:
+            self.ai_agent.close()
+        
         print("✅ Monitoring stopped successfully")
     
     def generate_session_report(self):
@@ -325,34 +631,18 @@ class SmartStudentMonitor:
             progress_report = self.ai_agent.generate_progress_report()
             
             # Get session statistics
-            session_duration = (datetime.now() - self.ai_agent.student_activity['session_start']).total_seconds() / 60
+            now = datetime.now()
+            sa = self.ai_agent.student_activity
+            session_duration = self.ai_agent.get_session_minutes()
             
-            report = f"""
-🎓 SMART MONITORING SESSION REPORT
-{'=' * 50}
-📅 Session Date: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
-⏱️ Session Duration: {session_duration:.1f} minutes
-
-📈 AI ANALYSIS SUMMARY:
-{progress_report}
-
-📊 SESSION STATISTICS:
-• Encouragements Given: {self.ai_agent.student_activity['encouragement_count']}
-• Warnings Issued: {self.ai_agent.student_activity['warning_count']}
-• Interventions Performed: {self.ai_agent.student_activity['intervention_count']}
-
-💡 SYSTEM FEATURES USED:
-• Computer Vision Analysis ✅
-• Intelligent Decision Making ✅
-• Dynamic Timeout Adjustment ✅
-• Contextual Messaging ✅
-• Pattern Recognition ✅
-
-📁 LOG FILES CREATED:
-• Browser Activity: logs.csv
-• AI Analysis: ai_analysis.csv
-• Screenshots: screenshots/ directory
-            """
+            report = SESSION_REPORT_TEMPLATE.format(
+                session_date=now.strftime('%Y-%m-%d %H:%M:%S'),
+                session_duration=session_duration,
+                progress_report=progress_report,
+                encouragement_count=sa['encouragement_count'],
+                warning_count=sa['warning_count'],
+                intervention_count=sa['intervention_count'],
+            )
             
             return report
             
@@ -379,6 +669,9 @@ def main():
     
     args = parser.parse_args()
     
+    # Only the CLI entry point needs these
+    from config import validate_config, get_config_summary
+    
     # Show configuration if requested
     if args.config:
         print("📋 Current Configuration:")
@@ -416,30 +709,39 @@ def main():
                 print(f"📊 Found {len(recent_activity)} recent activities")
                 analysis = agent.analyze_student_behavior(recent_activity)
                 
-                print("\n🎯 AI ANALYSIS RESULTS:")
-                print(f"Current URL: {analysis.get('current_url', 'N/A')}")
-                print(f"Recommendation: {analysis.get('recommendation', 'N/A')}")
-                print(f"Timeout: {analysis.get('timeout', 0)} seconds")
-                print(f"Message: {analysis.get('message', 'N/A')}")
-                print(f"Reasoning: {analysis.get('reasoning', 'N/A')}")
-                print(f"Urgency: {analysis.get('urgency', 'N/A')}")
-                print(f"Emotion: {analysis.get('emotion', 'N/A')}")
+                # Bind the fields once and print the whole result block in one call
+                get = analysis.get
+                lines = [
+                    "\n🎯 AI ANALYSIS RESULTS:",
+                    f"Current URL: {get('current_url', 'N/A')}",
+                    f"Recommendation: {get('recommendation', 'N/A')}",
+                    f"Timeout: {get('timeout', 0)} seconds",
+                    f"Message: {get('message', 'N/A')}",
+                    f"Reasoning: {get('reasoning', 'N/A')}",
+                    f"Urgency: {get('urgency', 'N/A')}",
+                    f"Emotion: {get('emotion', 'N/A')}",
+                ]
                 
                 # Show detailed analysis
-                screenshot_analysis = analysis.get('screenshot_analysis', {})
+                screenshot_analysis = get('screenshot_analysis', {})
                 if screenshot_analysis:
-                    print(f"\n📸 SCREENSHOT ANALYSIS:")
-                    print(f"Content type: {screenshot_analysis.get('content_type', 'N/A')}")
-                    print(f"Educational value: {screenshot_analysis.get('educational_value', 0)}/10")
-                    print(f"Distraction level: {screenshot_analysis.get('distraction_level', 0)}/10")
-                    print(f"Description: {screenshot_analysis.get('description', 'N/A')}")
+                    lines += [
+                        "\n📸 SCREENSHOT ANALYSIS:",
+                        f"Content type: {screenshot_analysis.get('content_type', 'N/A')}",
+                        f"Educational value: {screenshot_analysis.get('educational_value', 0)}/10",
+                        f"Distraction level: {screenshot_analysis.get('distraction_level', 0)}/10",
+                        f"Description: {screenshot_analysis.get('description', 'N/A')}",
+                    ]
                 
-                pattern_analysis = analysis.get('pattern_analysis', {})
+                pattern_analysis = get('pattern_analysis', {})
                 if pattern_analysis:
-                    print(f"\n📈 PATTERN ANALYSIS:")
-                    print(f"Browsing pattern: {pattern_analysis.get('pattern', 'N/A')}")
-                    print(f"Focus score: {pattern_analysis.get('focus_score', 0)}/10")
-                    print(f"Educational ratio: {pattern_analysis.get('educational_ratio', 0):.2f}")
+                    lines += [
+                        "\n📈 PATTERN ANALYSIS:",
+                        f"Browsing pattern: {pattern_analysis.get('pattern', 'N/A')}",
+                        f"Focus score: {pattern_analysis.get('focus_score', 0)}/10",
+                        f"Educational ratio: {pattern_analysis.get('educational_ratio', 0):.2f}",
+                    ]
+                print("\n".join(lines))
                 
                 print(f"\n📋 PROGRESS REPORT:")
                 report = agent.generate_progress_report()
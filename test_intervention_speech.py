@@ -4,101 +4,152 @@ Test script for intervention speech feedback
 Demonstrates how the AI speaks when performing serious interventions
 """
 
-import asyncio
 import sys
 import os
-from ai_agent import SmartStudentAIAgent
+import time
+from dataclasses import dataclass, field
+from speech_test_helpers import batch_synthesize, close_lmnt, get_agent, run_async
+
+# Report separators
+_SEP40 = "=" * 40
+_SEP50 = "=" * 50
+
+@dataclass(slots=True, frozen=True)
+class Analysis:
+    """The parts of an AI analysis the speech feedback looks at"""
+    recommendation: str
+    current_url: str
+    time_on_site: int
+    message: str
+    reasoning: str
+    urgency: str
+    pattern_analysis: dict
+    # Dict form handed to the agent, built once
+    payload: dict = field(init=False, repr=False, compare=False)
+    
+    def __post_init__(self):
+        object.__setattr__(self, 'payload', {
+            'recommendation': self.recommendation,
+            'current_url': self.current_url,
+            'time_on_site': self.time_on_site,
+            'message': self.message,
+            'reasoning': self.reasoning,
+            'urgency': self.urgency,
+            'pattern_analysis': self.pattern_analysis,
+        })
+
+@dataclass(slots=True, frozen=True)
+class Scenario:
+    """One intervention test case"""
+    name: str
+    analysis: Analysis
+    # Report lines for the scenario details; the scenarios never change, so format once
+    header: str = field(init=False, repr=False, compare=False)
+    
+    def __post_init__(self):
+        analysis = self.analysis
+        object.__setattr__(self, 'header', (
+            f"📍 URL: {analysis.current_url}\n"
+            f"⏱️ Time on site: {analysis.time_on_site/60:.1f} minutes\n"
+            f"🎯 Recommendation: {analysis.recommendation}\n"
+            f"⚡ Urgency: {analysis.urgency}\n"
+            f"🔍 Reasoning: {analysis.reasoning}"
+        ))
+
+# Test scenarios with different urgency levels
+TEST_SCENARIOS = (
+    Scenario(
+        name="🚨 High Urgency - Inappropriate Content",
+        analysis=Analysis(
+            recommendation='intervene',
+            current_url='https://tinder.com',
+            time_on_site=120,
+            message='Inappropriate content detected. Redirecting to educational resources.',
+            reasoning='inappropriate domain "tinder.com" detected',
+            urgency='high',
+            pattern_analysis={'focus_score': 3},
+        ),
+    ),
+    Scenario(
+        name="⚠️ Medium Urgency - Long Distraction",
+        analysis=Analysis(
+            recommendation='intervene',
+            current_url='https://youtube.com/watch?v=funny_video',
+            time_on_site=450,  # 7.5 minutes
+            message='Extended time on distracting content. Redirecting to educational resources.',
+            reasoning='Extended time on distracting site',
+            urgency='medium',
+            pattern_analysis={'focus_score': 4},
+        ),
+    ),
+    Scenario(
+        name="🎉 Encouragement - Educational Content",
+        analysis=Analysis(
+            recommendation='encourage',
+            current_url='https://khanacademy.org/math',
+            time_on_site=300,
+            message='Great job staying focused on your studies!',
+            reasoning='Educational site detected',
+            urgency='low',
+            pattern_analysis={'focus_score': 8},
+        ),
+    ),
+)
 
 async def test_intervention_speech():
     """Test speech feedback for different types of interventions"""
     print("🎤 Testing Intervention Speech Feedback...")
     
     try:
-        # Initialize AI agent
-        agent = SmartStudentAIAgent()
+        # Shared AI agent
+        agent = get_agent()
         
-        # Test scenarios with different urgency levels
-        test_scenarios = [
-            {
-                "name": "🚨 High Urgency - Inappropriate Content",
-                "analysis": {
-                    'recommendation': 'intervene',
-                    'current_url': 'https://tinder.com',
-                    'time_on_site': 120,
-                    'message': 'Inappropriate content detected. Redirecting to educational resources.',
-                    'reasoning': 'inappropriate domain "tinder.com" detected',
-                    'urgency': 'high',
-                    'pattern_analysis': {'focus_score': 3}
-                }
-            },
-            {
-                "name": "⚠️ Medium Urgency - Long Distraction",
-                "analysis": {
-                    'recommendation': 'intervene',
-                    'current_url': 'https://youtube.com/watch?v=funny_video',
-                    'time_on_site': 450,  # 7.5 minutes
-                    'message': 'Extended time on distracting content. Redirecting to educational resources.',
-                    'reasoning': 'Extended time on distracting site',
-                    'urgency': 'medium',
-                    'pattern_analysis': {'focus_score': 4}
-                }
-            },
-            {
-                "name": "🎉 Encouragement - Educational Content",
-                "analysis": {
-                    'recommendation': 'encourage',
-                    'current_url': 'https://khanacademy.org/math',
-                    'time_on_site': 300,
-                    'message': 'Great job staying focused on your studies!',
-                    'reasoning': 'Educational site detected',
-                    'urgency': 'low',
-                    'pattern_analysis': {'focus_score': 8}
-                }
-            }
-        ]
-        
-        for i, scenario in enumerate(test_scenarios, 1):
-            print(f"\n{'='*50}")
-            print(f"🧪 Test {i}: {scenario['name']}")
-            print(f"{'='*50}")
-            
-            analysis = scenario['analysis']
-            
-            # Show scenario details
-            print(f"📍 URL: {analysis['current_url']}")
-            print(f"⏱️ Time on site: {analysis['time_on_site']/60:.1f} minutes")
-            print(f"🎯 Recommendation: {analysis['recommendation']}")
-            print(f"⚡ Urgency: {analysis['urgency']}")
-            print(f"🔍 Reasoning: {analysis['reasoning']}")
-            
-            # Test if speech should be given
+        # Plan every scenario first (speak or not, and what to say); these are pure
+        # functions of the scenario, so all the synthesis can then start at once
+        plans = []
+        for scenario in TEST_SCENARIOS:
+            analysis = scenario.analysis.payload
             should_speak = agent.should_give_speech_feedback(analysis)
-            print(f"🗣️ Should give speech: {'YES' if should_speak else 'NO'}")
+            plans.append((scenario, agent.generate_speech_message(analysis) if should_speak else None))
+        speech_messages = [speech_message for _, speech_message in plans if speech_message is not None]
+        start = time.perf_counter()
+        audio_results = iter(await batch_synthesize(agent, speech_messages))
+        print(f"⏱️ Synthesized {len(speech_messages)} messages in {(time.perf_counter() - start) * 1000:.1f}ms")
+        
+        for i, (scenario, speech_message) in enumerate(plans, 1):
+            should_speak = speech_message is not None
+            lines = [
+                "\n" + _SEP50,
+                f"🧪 Test {i}: {scenario.name}",
+                _SEP50,
+                # Show scenario details
+                scenario.header,
+                f"🗣️ Should give speech: {'YES' if should_speak else 'NO'}",
+            ]
             
             if should_speak:
-                # Generate speech message
-                speech_message = agent.generate_speech_message(analysis)
-                print(f"💬 Generated speech: \"{speech_message}\"")
+                lines.append(f"💬 Generated speech: \"{speech_message}\"")
                 
                 # Test speech synthesis (but don't play to avoid spam)
-                print("🎤 Testing speech synthesis...")
-                audio_data = await agent.synthesize_speech(speech_message)
+                lines.append("🎤 Testing speech synthesis...")
+                audio_data, from_cache = next(audio_results)
                 if audio_data:
-                    print(f"✅ Speech synthesized successfully ({len(audio_data)} bytes)")
+                    source = "served from cache" if from_cache else "synthesized successfully"
+                    lines.append(f"✅ Speech {source} ({len(audio_data)} bytes)")
                 else:
-                    print("❌ Speech synthesis failed")
+                    lines.append("❌ Speech synthesis failed")
             
-            # Wait between tests
-            if i < len(test_scenarios):
-                print("\n⏳ Waiting 3 seconds before next test...")
-                await asyncio.sleep(3)
+            sys.stdout.write("\n".join(lines) + "\n")
         
-        print(f"\n🎉 All intervention speech tests completed!")
-        print(f"\n💡 Key Features Demonstrated:")
-        print(f"• 🚨 High urgency interventions ALWAYS get speech feedback")
-        print(f"• 💬 AI generates contextual, caring messages")
-        print(f"• 🎯 Different message styles for different intervention types")
-        print(f"• 🗣️ Explains the reasoning and suggests alternatives")
+        sys.stdout.write(
+            "\n🎉 All intervention speech tests completed!\n"
+            "\n💡 Key Features Demonstrated:\n"
+            "• 🚨 High urgency interventions ALWAYS get speech feedback\n"
+            "• 💬 AI generates contextual, caring messages\n"
+            "• 🎯 Different message styles for different intervention types\n"
+            "• 🗣️ Explains the reasoning and suggests alternatives\n"
+        )
+        sys.stdout.flush()
         
     except Exception as e:
         print(f"❌ Test error: {e}")
@@ -106,14 +157,20 @@ async def test_intervention_speech():
 def main():
     """Main test function"""
     print("🧪 Intervention Speech Feedback Test")
-    print("=" * 40)
+    print(_SEP40)
     print("This test demonstrates how the AI provides")
     print("detailed speech feedback for interventions,")
     print("especially serious ones involving inappropriate content.")
     print()
     
+    async def run_test():
+        try:
+            await test_intervention_speech()
+        finally:
+            await close_lmnt()
+    
     # Run async test
-    asyncio.run(test_intervention_speech())
+    run_async(run_test())
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file